@@ -1,13 +1,35 @@
-from abc import ABC, abstractmethod
-from typing import List
-from itertools import product
-from src.quantitative_ctl import KripkeStructure
-from src.satisfaction_degree import weighted_distance, find_extreme_state, get_border_states
-from src.custom_types import SubspaceType, QuantLabelingFnType, MaxActivitiesType
-from src.priority_queue import MinPriorityQueue, MaxPriorityQueue
+from abc import ABCMeta, abstractmethod
+from typing import Dict, List, Optional, Set
+from weakref import WeakValueDictionary
+from itertools import count
+import numpy as np
+from src.quantitative_ctl import KripkeStructure, full_domains
+from src.satisfaction_degree import satisfaction_degree_batch
+from src.custom_types import QuantLabelingFnType, MaxActivitiesType, DovType, DomainsType
+from src.fixpoints import globally_fixpoint, until_fixpoint, weak_until_fixpoint, FixpointType
+
+
+class _InternedFormulaMeta(ABCMeta):
+    """
+    Metaclass interning the formulae, constructing a formula of the same class from the same arguments
+    returns the already existing instance, so that structurally equal subformulae are evaluated only once.
+
+    The instances are cached weakly, a formula lives only as long as it is referenced from outside the cache.
+    A cached instance is shared by all its constructions, so formulae are never changed after construction.
+    """
+
+    _instances: 'WeakValueDictionary[tuple, StateFormula]' = WeakValueDictionary()
+
+    def __call__(cls, *args, **kwargs):
+        key = (cls, args, tuple(sorted(kwargs.items())))
+        instance = _InternedFormulaMeta._instances.get(key)
+        if instance is None:
+            instance = super().__call__(*args, **kwargs)
+            _InternedFormulaMeta._instances[key] = instance
+        return instance
 
 
-class StateFormula(ABC):
+class StateFormula(metaclass=_InternedFormulaMeta):
     """
     Abstract base class representing a state CTL formula.
 
@@ -15,26 +37,55 @@ class StateFormula(ABC):
     of a Kripke structure. This class provides an interface for eliminating
     negation, retrieving subformulae, and evaluating the formula in a given
     Kripke structure.
+
+    Every formula instance gets a unique integer identifier at construction, the formulae evaluations map it
+    to the column of the formula.
+
+    Formulae are interned, structurally equal formulae constructed from the same arguments are the same instance.
     """
 
+    _next_id = count()
+    _negation_free = False  # set once eliminate_negation has normalized the whole subtree
+
+    def __init__(self) -> None:
+        self._id = next(StateFormula._next_id)
+        self._subformulae: Optional[List['StateFormula']] = None  # memoized result of get_subformulae
+
     @abstractmethod
     def eliminate_negation(self) -> 'StateFormula':
         """
         Eliminates negation from the formula, returning an equivalent negation-free formula.
+        Formulae are interned and never changed, the normalized formula is constructed instead. Normalized formulae
+        are marked, so repeated calls return without walking the tree again.
 
         @return StateFormula: A transformed version of the formula without negations.
         """
         pass
 
-    @abstractmethod
     def get_subformulae(self) -> List['StateFormula']:
         """
         Retrieves a list of subformulae contained within this formula.
         Important: The order in list ensures that all the subformulas of any formula are listed before.
         Especially, this means that when evaluating a formula, all of its subformulas have already been evaluated.
+        Each (possibly shared) subformula is listed only once. The list is memoized (formulae are never changed),
+        it must not be modified.
 
         @return A list of subformulae, where each element is an instance of StateFormula.
         """
+        if self._subformulae is None:
+            subformulae = []
+            self._collect(subformulae, set())
+            self._subformulae = subformulae
+        return self._subformulae
+
+    @abstractmethod
+    def _collect(self, out: List['StateFormula'], seen: Set['StateFormula']) -> None:
+        """
+        Appends the subformulae that are not seen yet to out, each of them after its own subformulae.
+
+        @param out: The list of subformulae collected so far.
+        @param seen: The subformulae already in out, shared subtrees are traversed only once.
+        """
         pass
 
     @abstractmethod
@@ -43,7 +94,7 @@ class StateFormula(ABC):
         Evaluates the formula within the given Kripke structure.
 
         @param ks: The Kripke structure over which the formula is evaluated.
-        @param formulae_evaluations: A data structure storing the evaluation results for states.
+        @param formulae_evaluations: A table storing the evaluation results, one row per state, one column per formula.
         @return None: The function modifies formulae_evaluations in place.
         """
         pass
@@ -58,52 +109,54 @@ class AtomicFormula(StateFormula):
     """
 
     @abstractmethod
-    def compute_dov(self, max_activities: MaxActivitiesType) -> SubspaceType:
+    def compute_dov(self, max_activities: MaxActivitiesType, domains: Optional[DomainsType] = None,
+                    var_idx: Optional[Dict[str, int]] = None) -> DovType:
         """
         Computes the domain of validity for the atomic formula.
 
+        The domain of validity is a boolean mask over the grid of all the states with one axis per variable,
+        i.e. dov[state] tells whether the state satisfies the formula.
+
         @param max_activities: The maximum possible values for each variable.
-        @return: Updated domain of validity.
+        @param domains: The domains of the variables (e.g. ks.initial_dov), created from max_activities if not given.
+        @param var_idx: The axis of each variable (e.g. ks.var_idx), looked up in max_activities if not given.
+        @return: Domain of validity.
         """
         pass
 
-    def get_subformulae(self) -> List['StateFormula']:
+    def _collect(self, out: List['StateFormula'], seen: Set['StateFormula']) -> None:
         """
-        Returns the subformulae of the atomic formula.
-
-        Since atomic formulas are indivisible, they return themselves.
-
-        @return: List containing only this formula.
+        Collects the atomic formula. Since atomic formulas are indivisible, only the formula itself is collected.
         """
-        return [self]
+        if self not in seen:
+            seen.add(self)
+            out.append(self)
 
     def evaluate(self, ks: KripkeStructure, formulae_evaluations: QuantLabelingFnType) -> None:
         """
         Evaluates the atomic formula in a given Kripke structure.
 
         @param ks: The Kripke structure to evaluate against.
-        @param formulae_evaluations: A mapping of states to formula evaluations.
+        @param formulae_evaluations: A table of formula evaluations, one row per state.
         """
-        dov = self.compute_dov(ks.stg.variables)
-        co_dov = self.compute_dov_complement(dov, ks.stg.variables)
-        dov_b, co_dov_b = get_border_states(dov, list(ks.stg.variables.values()))
-        max_depth = find_extreme_state(dov, co_dov_b, list(ks.stg.variables.values()))
-        max_dist = find_extreme_state(co_dov, dov_b, list(ks.stg.variables.values()))
-        for state in ks.stg.states:
-            if state in dov:
-                wd = weighted_distance(state, co_dov_b, list(ks.stg.variables.values()))
-                formulae_evaluations[state][repr(self)] = wd / max_depth if max_depth > 0 else 0
-            else:
-                wd = weighted_distance(state, dov_b, list(ks.stg.variables.values()))
-                formulae_evaluations[state][repr(self)] = -wd / max_dist if max_depth > 0 else 0
-
+        self.evaluate_batch(ks, [self], formulae_evaluations.column(self)[:, np.newaxis])
 
     @staticmethod
-    def compute_dov_complement(dov, max_activities) -> SubspaceType:
-        """Returns the complement of the given set of states within the valid space."""
-        variables = list(max_activities.keys())  # Ensure correct order
-        full_space = set(product(*(range(max_activities[var] + 1) for var in variables)))
-        return full_space - dov
+    def evaluate_batch(ks: KripkeStructure, atomic_formulae: List['AtomicFormula'], out: np.ndarray) -> None:
+        """
+        Evaluates several atomic formulae in a given Kripke structure at once.
+
+        The domains of validity of all the formulae are stacked, so that the distance computation and the pass over
+        the states are shared by all of them.
+
+        @param ks: The Kripke structure to evaluate against.
+        @param atomic_formulae: The atomic formulae to be evaluated.
+        @param out: Array of shape (number of states, number of formulae) the values are written to.
+        """
+        dovs = np.stack([formula.compute_dov(ks.stg.variables, ks.initial_dov, ks.var_idx)
+                         for formula in atomic_formulae])
+        # all states are processed at once, inside states measure their distance to co-DoV border and vice versa
+        satisfaction_degree_batch(dovs, ks.grid_indices, ks.weights_arr, out)
 
     @abstractmethod
     def negate(self):
@@ -112,6 +165,7 @@ class AtomicFormula(StateFormula):
 
 class AtomicProposition(AtomicFormula):
     def __init__(self, variable: str, operator: str, value: int) -> None:
+        super().__init__()
         self.variable = variable
         self.operator = operator
         self.value = value
@@ -119,16 +173,15 @@ class AtomicProposition(AtomicFormula):
     def __repr__(self) -> str:
         return f"({self.variable} {self.operator} {self.value})"
 
-    def compute_dov(self, max_activities: MaxActivitiesType) -> SubspaceType:
-        max_val = max_activities[self.variable]
-        if self.operator == ">=":
-            valid_values = range(self.value, max_val + 1)
-        else:  # self.operator == "<="
-            valid_values = range(0, self.value + 1)
-        domains = []
-        for var in max_activities.keys():
-            domains.append(valid_values if var == self.variable else range(0, max_activities[var] + 1))
-        return set(product(*domains))
+    def compute_dov(self, max_activities: MaxActivitiesType, domains: Optional[DomainsType] = None,
+                    var_idx: Optional[Dict[str, int]] = None) -> DovType:
+        if domains is None:
+            domains = full_domains(max_activities)
+        axis = var_idx[self.variable] if var_idx is not None else list(max_activities.keys()).index(self.variable)
+        values = domains[axis]
+        valid_values = values >= self.value if self.operator == ">=" else values <= self.value
+        # the condition along the axis of the variable is broadcast over the other axes
+        return np.broadcast_to(valid_values, np.broadcast_shapes(*(domain.shape for domain in domains)))
 
     def eliminate_negation(self) -> 'AtomicFormula':
         return self
@@ -142,12 +195,14 @@ class AtomicProposition(AtomicFormula):
 
 class Negation(AtomicFormula):
     def __init__(self, operand: AtomicFormula) -> None:
+        super().__init__()
         self.operand = operand
 
     def __repr__(self) -> str:
         return f"!{repr(self.operand)}"
 
-    def compute_dov(self, max_activities: MaxActivitiesType) -> SubspaceType:
+    def compute_dov(self, max_activities: MaxActivitiesType, domains: Optional[DomainsType] = None,
+                    var_idx: Optional[Dict[str, int]] = None) -> DovType:
         raise NotImplementedError("Negation must be eliminated before calling yield_dov.")
 
     def eliminate_negation(self) -> AtomicFormula:
@@ -155,7 +210,7 @@ class Negation(AtomicFormula):
             return self.operand.operand.eliminate_negation()
         return self
 
-    def get_subformulae(self) -> List['StateFormula']:
+    def _collect(self, out: List['StateFormula'], seen: Set['StateFormula']) -> None:
         raise NotImplementedError("Negation must be eliminated before calling get_subformulae.")
 
     def negate(self):
@@ -164,25 +219,27 @@ class Negation(AtomicFormula):
 
 class Union(AtomicFormula):
     def __init__(self, left: AtomicFormula, right: AtomicFormula) -> None:
+        super().__init__()
         self.left = left
         self.right = right
 
     def __repr__(self) -> str:
         return f"({repr(self.left)} | {repr(self.right)})"
 
-    def compute_dov(self, max_activities: MaxActivitiesType) -> SubspaceType:
-        left_dov = self.left.compute_dov(max_activities)
-        right_dov = self.right.compute_dov(max_activities)
-        return left_dov.union(right_dov)
+    def compute_dov(self, max_activities: MaxActivitiesType, domains: Optional[DomainsType] = None,
+                    var_idx: Optional[Dict[str, int]] = None) -> DovType:
+        left_dov = self.left.compute_dov(max_activities, domains, var_idx)
+        right_dov = self.right.compute_dov(max_activities, domains, var_idx)
+        return left_dov | right_dov
 
     def eliminate_negation(self) -> AtomicFormula:
-        if isinstance(self.left, Negation):
-            self.left = self.left.negate()
-        if isinstance(self.right, Negation):
-            self.right = self.right.negate()
-        self.left = self.left.eliminate_negation()
-        self.right = self.right.eliminate_negation()
-        return self
+        if self._negation_free:
+            return self
+        left = self.left.negate() if isinstance(self.left, Negation) else self.left
+        right = self.right.negate() if isinstance(self.right, Negation) else self.right
+        formula = type(self)(left.eliminate_negation(), right.eliminate_negation())  # interned, never changed
+        formula._negation_free = True
+        return formula
 
     def negate(self):
         return Intersection(Negation(self.left), Negation(self.right))
@@ -190,25 +247,27 @@ class Union(AtomicFormula):
 
 class Intersection(AtomicFormula):
     def __init__(self, left: AtomicFormula, right: AtomicFormula) -> None:
+        super().__init__()
         self.left = left
         self.right = right
 
     def __repr__(self) -> str:
         return f"({repr(self.left)} & {repr(self.right)})"
 
-    def compute_dov(self, max_activities: MaxActivitiesType) -> SubspaceType:
-        left_dov = self.left.compute_dov(max_activities)
-        right_dov = self.right.compute_dov(max_activities)
-        return left_dov.intersection(right_dov)
+    def compute_dov(self, max_activities: MaxActivitiesType, domains: Optional[DomainsType] = None,
+                    var_idx: Optional[Dict[str, int]] = None) -> DovType:
+        left_dov = self.left.compute_dov(max_activities, domains, var_idx)
+        right_dov = self.right.compute_dov(max_activities, domains, var_idx)
+        return left_dov & right_dov
 
     def eliminate_negation(self) -> AtomicFormula:
-        if isinstance(self.left, Negation):
-            self.left = self.left.negate()
-        if isinstance(self.right, Negation):
-            self.right = self.right.negate()
-        self.left = self.left.eliminate_negation()
-        self.right = self.right.eliminate_negation()
-        return self
+        if self._negation_free:
+            return self
+        left = self.left.negate() if isinstance(self.left, Negation) else self.left
+        right = self.right.negate() if isinstance(self.right, Negation) else self.right
+        formula = type(self)(left.eliminate_negation(), right.eliminate_negation())  # interned, never changed
+        formula._negation_free = True
+        return formula
 
     def negate(self):
         return Union(Negation(self.left), Negation(self.right))
@@ -216,6 +275,7 @@ class Intersection(AtomicFormula):
 
 class Boolean(StateFormula):
     def __init__(self, value: bool):
+        super().__init__()
         self.value = value
 
     def __repr__(self) -> str:
@@ -224,16 +284,18 @@ class Boolean(StateFormula):
     def eliminate_negation(self) -> 'StateFormula':
         return self
 
-    def get_subformulae(self) -> List['StateFormula']:
-        return [self]
+    def _collect(self, out: List['StateFormula'], seen: Set['StateFormula']) -> None:
+        if self not in seen:
+            seen.add(self)
+            out.append(self)
 
     def evaluate(self, ks: KripkeStructure, formulae_evaluations: QuantLabelingFnType) -> None:
-        for state in ks.stg.states:
-            formulae_evaluations[state][repr(self)] = 1 if self.value else -1
+        formulae_evaluations.column(self).fill(1 if self.value else -1)
 
 
 class Conjunction(StateFormula):
     def __init__(self, left: StateFormula, right: StateFormula):
+        super().__init__()
         self.left = left
         self.right = right
 
@@ -241,26 +303,29 @@ class Conjunction(StateFormula):
         return f"({repr(self.left)} && {repr(self.right)})"
 
     def eliminate_negation(self) -> 'StateFormula':
-        if isinstance(self.left, Negation):
-            self.left = self.left.negate()
-        if isinstance(self.right, Negation):
-            self.right = self.right.negate()
-        self.left = self.left.eliminate_negation()
-        self.right = self.right.eliminate_negation()
-        return self
-
-    def get_subformulae(self) -> List['StateFormula']:
-        sub_left = self.left.get_subformulae()
-        sub_right = self.right.get_subformulae()
-        return sub_left + sub_right + [self]
+        if self._negation_free:
+            return self
+        left = self.left.negate() if isinstance(self.left, Negation) else self.left
+        right = self.right.negate() if isinstance(self.right, Negation) else self.right
+        formula = type(self)(left.eliminate_negation(), right.eliminate_negation())  # interned, never changed
+        formula._negation_free = True
+        return formula
+
+    def _collect(self, out: List['StateFormula'], seen: Set['StateFormula']) -> None:
+        if self not in seen:
+            self.left._collect(out, seen)
+            self.right._collect(out, seen)
+            seen.add(self)
+            out.append(self)
 
     def evaluate(self, ks: KripkeStructure, formulae_evaluations: QuantLabelingFnType) -> None:
-        for state in ks.stg.states:
-            formulae_evaluations[state][repr(self)] = min(formulae_evaluations[state][repr(self.left)], formulae_evaluations[state][repr(self.right)])
+        np.minimum(formulae_evaluations.column(self.left), formulae_evaluations.column(self.right),
+                   out=formulae_evaluations.column(self))
 
 
 class Disjunction(StateFormula):
     def __init__(self, left: StateFormula, right: StateFormula):
+        super().__init__()
         self.left = left
         self.right = right
 
@@ -268,300 +333,261 @@ class Disjunction(StateFormula):
         return f"({repr(self.left)} || {repr(self.right)})"
 
     def eliminate_negation(self) -> 'StateFormula':
-        if isinstance(self.left, Negation):
-            self.left = self.left.negate()
-        if isinstance(self.right, Negation):
-            self.right = self.right.negate()
-        self.left = self.left.eliminate_negation()
-        self.right = self.right.eliminate_negation()
-        return self
-
-    def get_subformulae(self) -> List['StateFormula']:
-        sub_left = self.left.get_subformulae()
-        sub_right = self.right.get_subformulae()
-        return sub_left + sub_right + [self]
+        if self._negation_free:
+            return self
+        left = self.left.negate() if isinstance(self.left, Negation) else self.left
+        right = self.right.negate() if isinstance(self.right, Negation) else self.right
+        formula = type(self)(left.eliminate_negation(), right.eliminate_negation())  # interned, never changed
+        formula._negation_free = True
+        return formula
+
+    def _collect(self, out: List['StateFormula'], seen: Set['StateFormula']) -> None:
+        if self not in seen:
+            self.left._collect(out, seen)
+            self.right._collect(out, seen)
+            seen.add(self)
+            out.append(self)
 
     def evaluate(self, ks: KripkeStructure, formulae_evaluations: QuantLabelingFnType) -> None:
-        for state in ks.stg.states:
-            formulae_evaluations[state][repr(self)] = max(formulae_evaluations[state][repr(self.left)], formulae_evaluations[state][repr(self.right)])
+        np.maximum(formulae_evaluations.column(self.left), formulae_evaluations.column(self.right),
+                   out=formulae_evaluations.column(self))
 
 
 class AG(StateFormula):
     def __init__(self, operand: StateFormula):
+        super().__init__()
         self.operand = operand
+        self._previous: Optional[FixpointType] = None  # last fixpoint computation, reused by the next one
 
     def __repr__(self) -> str:
         return f"AG ({repr(self.operand)})"
 
     def eliminate_negation(self) -> 'StateFormula':
-        if isinstance(self.operand, Negation):
-            self.operand = self.operand.negate()
-        self.operand = self.operand.eliminate_negation()
-        return self
-
-    def get_subformulae(self) -> List['StateFormula']:
-        return self.operand.get_subformulae() + [self]
+        if self._negation_free:
+            return self
+        operand = self.operand.negate() if isinstance(self.operand, Negation) else self.operand
+        formula = type(self)(operand.eliminate_negation())  # interned, never changed
+        formula._negation_free = True
+        return formula
+
+    def _collect(self, out: List['StateFormula'], seen: Set['StateFormula']) -> None:
+        if self not in seen:
+            self.operand._collect(out, seen)
+            seen.add(self)
+            out.append(self)
 
     def evaluate(self, ks: KripkeStructure, formulae_evaluations: QuantLabelingFnType) -> None:
-        queue = MinPriorityQueue()
-        for state in ks.stg.states:
-            formulae_evaluations[state][repr(self)] = formulae_evaluations[state][repr(self.operand)]
-            predcs = ks.stg.graph.predecessors(state)
-            for p in predcs:
-                queue.decrease_priority(p, formulae_evaluations[state][repr(self.operand)])
-
-        while queue.heap:
-            state, _ = queue.extract_min()
-            succs = ks.stg.graph.successors(state)
-            min_value = min([formulae_evaluations[s][repr(self.operand)] for s in succs])  # all needs minimal value of operand
-            # if state has no value yet or propagated minimal value is smaller than actual best, replace it and notify predecessors
-            if min_value < formulae_evaluations[state][repr(self)]:
-                formulae_evaluations[state][repr(self)] = min_value  # replace the original value
-                predcs = ks.stg.graph.predecessors(state)
-                for p in predcs:
-                    queue.decrease_priority(p, formulae_evaluations[state][repr(self.operand)])
+        operand, out = formulae_evaluations.column(self.operand), formulae_evaluations.column(self)
+        self._previous = globally_fixpoint(ks, operand, out, all_paths=True, minimize=True, previous=self._previous)
 
 
 class EG(StateFormula):
     def __init__(self, operand: StateFormula):
+        super().__init__()
         self.operand = operand
+        self._previous: Optional[FixpointType] = None  # last fixpoint computation, reused by the next one
 
     def __repr__(self) -> str:
         return f"EG ({repr(self.operand)})"
 
     def eliminate_negation(self) -> 'StateFormula':
-        if isinstance(self.operand, Negation):
-            self.operand = self.operand.negate()
-        self.operand = self.operand.eliminate_negation()
-        return self
-
-    def get_subformulae(self) -> List['StateFormula']:
-        return self.operand.get_subformulae() + [self]
+        if self._negation_free:
+            return self
+        operand = self.operand.negate() if isinstance(self.operand, Negation) else self.operand
+        formula = type(self)(operand.eliminate_negation())  # interned, never changed
+        formula._negation_free = True
+        return formula
+
+    def _collect(self, out: List['StateFormula'], seen: Set['StateFormula']) -> None:
+        if self not in seen:
+            self.operand._collect(out, seen)
+            seen.add(self)
+            out.append(self)
 
     def evaluate(self, ks: KripkeStructure, formulae_evaluations: QuantLabelingFnType) -> None:
-        queue = MinPriorityQueue()
-        for state in ks.stg.states:
-            formulae_evaluations[state][repr(self)] = formulae_evaluations[state][repr(self.operand)]
-            predcs = ks.stg.graph.predecessors(state)
-            for p in predcs:
-                queue.decrease_priority(p, formulae_evaluations[state][repr(self.operand)])
-
-        while queue.heap:
-            state, _ = queue.extract_min()
-            succs = ks.stg.graph.successors(state)
-            max_value = max([formulae_evaluations[s][repr(self.operand)] for s in succs])  # exists needs maximal value of operand
-            # if state has no value yet or propagated maximal value is smaller than actual best, replace it and notify predecessors
-            if max_value < formulae_evaluations[state][repr(self)]:
-                formulae_evaluations[state][repr(self)] = max_value  # replace the original value
-                predcs = ks.stg.graph.predecessors(state)
-                for p in predcs:
-                    queue.decrease_priority(p, formulae_evaluations[state][repr(self.operand)])
+        operand, out = formulae_evaluations.column(self.operand), formulae_evaluations.column(self)
+        self._previous = globally_fixpoint(ks, operand, out, all_paths=False, minimize=True, previous=self._previous)
 
 
 class AF(StateFormula):
     def __init__(self, operand: StateFormula):
+        super().__init__()
         self.operand = operand
+        self._previous: Optional[FixpointType] = None  # last fixpoint computation, reused by the next one
 
     def __repr__(self) -> str:
         return f"AF ({repr(self.operand)})"
 
     def eliminate_negation(self) -> 'StateFormula':
-        if isinstance(self.operand, Negation):
-            self.operand = self.operand.negate()
-        self.operand = self.operand.eliminate_negation()
-        return self
-
-    def get_subformulae(self) -> List['StateFormula']:
-        return self.operand.get_subformulae() + [self]
+        if self._negation_free:
+            return self
+        operand = self.operand.negate() if isinstance(self.operand, Negation) else self.operand
+        formula = type(self)(operand.eliminate_negation())  # interned, never changed
+        formula._negation_free = True
+        return formula
+
+    def _collect(self, out: List['StateFormula'], seen: Set['StateFormula']) -> None:
+        if self not in seen:
+            self.operand._collect(out, seen)
+            seen.add(self)
+            out.append(self)
 
     def evaluate(self, ks: KripkeStructure, formulae_evaluations: QuantLabelingFnType) -> None:
-        queue = MaxPriorityQueue()
-        for state in ks.stg.states:
-            formulae_evaluations[state][repr(self)] = formulae_evaluations[state][repr(self.operand)]
-            predcs = ks.stg.graph.predecessors(state)
-            for p in predcs:
-                queue.increase_priority(p, formulae_evaluations[state][repr(self.operand)])
-
-        while queue.heap:
-            state, _ = queue.extract_max()
-            succs = list(ks.stg.graph.successors(state))
-            min_value = min([formulae_evaluations[s][repr(self.operand)] for s in succs])  # all needs minimal value of operand
-            # if state has no value yet or propagated minimal value is greater than actual best, replace it and notify predecessors
-            if min_value > formulae_evaluations[state][repr(self)]:
-                formulae_evaluations[state][repr(self)] = min_value  # replace the original value
-                predcs = ks.stg.graph.predecessors(state)
-                for p in predcs:
-                    queue.increase_priority(p, formulae_evaluations[state][repr(self.operand)])
+        operand, out = formulae_evaluations.column(self.operand), formulae_evaluations.column(self)
+        self._previous = globally_fixpoint(ks, operand, out, all_paths=True, minimize=False, previous=self._previous)
 
 
 class EF(StateFormula):
     def __init__(self, operand: StateFormula):
+        super().__init__()
         self.operand = operand
+        self._previous: Optional[FixpointType] = None  # last fixpoint computation, reused by the next one
 
     def __repr__(self) -> str:
         return f"EF ({repr(self.operand)})"
 
     def eliminate_negation(self) -> 'StateFormula':
-        if isinstance(self.operand, Negation):
-            self.operand = self.operand.negate()
-        self.operand = self.operand.eliminate_negation()
-        return self
-
-    def get_subformulae(self) -> List['StateFormula']:
-        return self.operand.get_subformulae() + [self]
+        if self._negation_free:
+            return self
+        operand = self.operand.negate() if isinstance(self.operand, Negation) else self.operand
+        formula = type(self)(operand.eliminate_negation())  # interned, never changed
+        formula._negation_free = True
+        return formula
+
+    def _collect(self, out: List['StateFormula'], seen: Set['StateFormula']) -> None:
+        if self not in seen:
+            self.operand._collect(out, seen)
+            seen.add(self)
+            out.append(self)
 
     def evaluate(self, ks: KripkeStructure, formulae_evaluations: QuantLabelingFnType) -> None:
-        queue = MaxPriorityQueue()
-        for state in ks.stg.states:
-            formulae_evaluations[state][repr(self)] = formulae_evaluations[state][repr(self.operand)]
-            predcs = ks.stg.graph.predecessors(state)
-            for p in predcs:
-                queue.increase_priority(p, formulae_evaluations[state][repr(self.operand)])
-
-        while queue.heap:
-            state, _ = queue.extract_max()
-            succs = ks.stg.graph.successors(state)
-            max_value = max([formulae_evaluations[s][repr(self.operand)] for s in succs])  # exists needs maximal value of operand
-            # if state has no value yet or propagated maximal value is greater than actual best, replace it and notify predecessors
-            if max_value > formulae_evaluations[state][repr(self)]:
-                formulae_evaluations[state][repr(self)] = max_value  # replace the original value
-                predcs = ks.stg.graph.predecessors(state)
-                for p in predcs:
-                    queue.increase_priority(p, formulae_evaluations[state][repr(self.operand)])
+        operand, out = formulae_evaluations.column(self.operand), formulae_evaluations.column(self)
+        self._previous = globally_fixpoint(ks, operand, out, all_paths=False, minimize=False, previous=self._previous)
 
 
 class AX(StateFormula):
     def __init__(self, operand: StateFormula):
+        super().__init__()
         self.operand = operand
 
     def __repr__(self) -> str:
         return f"AX ({repr(self.operand)})"
 
     def eliminate_negation(self) -> 'StateFormula':
-        if isinstance(self.operand, Negation):
-            self.operand = self.operand.negate()
-        self.operand = self.operand.eliminate_negation()
-        return self
-
-    def get_subformulae(self) -> List['StateFormula']:
-        return self.operand.get_subformulae() + [self]
+        if self._negation_free:
+            return self
+        operand = self.operand.negate() if isinstance(self.operand, Negation) else self.operand
+        formula = type(self)(operand.eliminate_negation())  # interned, never changed
+        formula._negation_free = True
+        return formula
+
+    def _collect(self, out: List['StateFormula'], seen: Set['StateFormula']) -> None:
+        if self not in seen:
+            self.operand._collect(out, seen)
+            seen.add(self)
+            out.append(self)
 
     def evaluate(self, ks: KripkeStructure, formulae_evaluations: QuantLabelingFnType) -> None:
-        for state in ks.stg.states:
-            succs = ks.stg.graph.successors(state)
-            formulae_evaluations[state][repr(self)] = min([formulae_evaluations[s][repr(self.operand)] for s in succs])
+        operand = formulae_evaluations.column(self.operand)
+        # one segment of successor values per state, every state has at least one successor
+        formulae_evaluations.column(self)[:] = np.minimum.reduceat(operand[ks.succ_indices], ks.succ_indptr[:-1])
 
 
 class EX(StateFormula):
     def __init__(self, operand: StateFormula):
+        super().__init__()
         self.operand = operand
 
     def __repr__(self) -> str:
         return f"EX ({repr(self.operand)})"
 
     def eliminate_negation(self) -> 'StateFormula':
-        if isinstance(self.operand, Negation):
-            self.operand = self.operand.negate()
-        self.operand = self.operand.eliminate_negation()
-        return self
-
-    def get_subformulae(self) -> List['StateFormula']:
-        return self.operand.get_subformulae() + [self]
+        if self._negation_free:
+            return self
+        operand = self.operand.negate() if isinstance(self.operand, Negation) else self.operand
+        formula = type(self)(operand.eliminate_negation())  # interned, never changed
+        formula._negation_free = True
+        return formula
+
+    def _collect(self, out: List['StateFormula'], seen: Set['StateFormula']) -> None:
+        if self not in seen:
+            self.operand._collect(out, seen)
+            seen.add(self)
+            out.append(self)
 
     def evaluate(self, ks: KripkeStructure, formulae_evaluations: QuantLabelingFnType) -> None:
-        for state in ks.stg.states:
-            succs = ks.stg.graph.successors(state)
-            formulae_evaluations[state][repr(self)] = max([formulae_evaluations[s][repr(self.operand)] for s in succs])
+        operand = formulae_evaluations.column(self.operand)
+        # one segment of successor values per state, every state has at least one successor
+        formulae_evaluations.column(self)[:] = np.maximum.reduceat(operand[ks.succ_indices], ks.succ_indptr[:-1])
 
 
 class AU(StateFormula):
     def __init__(self, left: StateFormula, right: StateFormula):
+        super().__init__()
         self.left = left
         self.right = right
+        self._previous: Optional[FixpointType] = None  # last fixpoint computation, reused by the next one
 
     def __repr__(self) -> str:
         return f"A ({repr(self.left)}) U ({repr(self.right)})"
 
     def eliminate_negation(self) -> 'StateFormula':
-        if isinstance(self.left, Negation):
-            self.left = self.left.negate()
-        if isinstance(self.right, Negation):
-            self.right = self.right.negate()
-        self.left = self.left.eliminate_negation()
-        self.right = self.right.eliminate_negation()
-        return self
-
-    def get_subformulae(self) -> List['StateFormula']:
-        sub_left = self.left.get_subformulae()
-        sub_right = self.right.get_subformulae()
-        return sub_left + sub_right + [self]
+        if self._negation_free:
+            return self
+        left = self.left.negate() if isinstance(self.left, Negation) else self.left
+        right = self.right.negate() if isinstance(self.right, Negation) else self.right
+        formula = type(self)(left.eliminate_negation(), right.eliminate_negation())  # interned, never changed
+        formula._negation_free = True
+        return formula
+
+    def _collect(self, out: List['StateFormula'], seen: Set['StateFormula']) -> None:
+        if self not in seen:
+            self.left._collect(out, seen)
+            self.right._collect(out, seen)
+            seen.add(self)
+            out.append(self)
 
     def evaluate(self, ks: KripkeStructure, formulae_evaluations: QuantLabelingFnType) -> None:
-        queue = MaxPriorityQueue()
-        for state in ks.stg.states:  # initialize the computation with the right operand value in each state
-            formulae_evaluations[state][repr(self)] = formulae_evaluations[state][repr(self.right)]
-            predcs = ks.stg.graph.predecessors(state)
-            for p in predcs:
-                queue.increase_priority(p, formulae_evaluations[state][repr(self.right)])
-
-        while queue.heap:
-            state, _ = queue.extract_max()
-            succs = ks.stg.graph.successors(state)
-            min_until_nexts = min([formulae_evaluations[s][repr(self)] for s in succs])  # all takes minimal value of the whole Until from successors
-            left_self, until_self = formulae_evaluations[state][repr(self.left)], formulae_evaluations[state][repr(self)]
-            extend = min(left_self, min_until_nexts)   # tries to extend the prefix with the current left
-            if extend > until_self:  # compare the extended prefix with actual value of until, if extension is better, then update
-                formulae_evaluations[state][repr(self)] = extend
-                predcs = ks.stg.graph.predecessors(state)
-                for p in predcs:
-                    queue.increase_priority(p, extend)
+        left, right = formulae_evaluations.column(self.left), formulae_evaluations.column(self.right)
+        out = formulae_evaluations.column(self)
+        self._previous = until_fixpoint(ks, left, right, out, all_paths=True, previous=self._previous)
 
 
 class EU(StateFormula):
     def __init__(self, left: StateFormula, right: StateFormula):
+        super().__init__()
         self.left = left
         self.right = right
+        self._previous: Optional[FixpointType] = None  # last fixpoint computation, reused by the next one
 
     def __repr__(self) -> str:
         return f"E ({repr(self.left)}) U ({repr(self.right)})"
 
     def eliminate_negation(self) -> 'StateFormula':
-        if isinstance(self.left, Negation):
-            self.left = self.left.negate()
-        if isinstance(self.right, Negation):
-            self.right = self.right.negate()
-        self.left = self.left.eliminate_negation()
-        self.right = self.right.eliminate_negation()
-        return self
-
-    def get_subformulae(self) -> List['StateFormula']:
-        sub_left = self.left.get_subformulae()
-        sub_right = self.right.get_subformulae()
-        return sub_left + sub_right + [self]
+        if self._negation_free:
+            return self
+        left = self.left.negate() if isinstance(self.left, Negation) else self.left
+        right = self.right.negate() if isinstance(self.right, Negation) else self.right
+        formula = type(self)(left.eliminate_negation(), right.eliminate_negation())  # interned, never changed
+        formula._negation_free = True
+        return formula
+
+    def _collect(self, out: List['StateFormula'], seen: Set['StateFormula']) -> None:
+        if self not in seen:
+            self.left._collect(out, seen)
+            self.right._collect(out, seen)
+            seen.add(self)
+            out.append(self)
 
     def evaluate(self, ks: KripkeStructure, formulae_evaluations: QuantLabelingFnType) -> None:
-        queue = MaxPriorityQueue()
-        for state in ks.stg.states:  # initialize the computation with the right operand value in each state
-            formulae_evaluations[state][repr(self)] = formulae_evaluations[state][repr(self.right)]
-            predcs = ks.stg.graph.predecessors(state)
-            for p in predcs:
-                queue.increase_priority(p, formulae_evaluations[state][repr(self.right)])  # not sure
-
-        while queue.heap:
-            state, _ = queue.extract_max()
-            succs = ks.stg.graph.successors(state)
-            max_until_nexts = max([formulae_evaluations[s][repr(self)] for s in succs])  # exists takes minimal value of the whole Until from successors
-            left_self, until_self = formulae_evaluations[state][repr(self.left)], formulae_evaluations[state][repr(self)]
-            extend = min(left_self, max_until_nexts)  # tries to extend the prefix with the current left
-            if extend > until_self:  # compare the extended prefix with actual value of until, if extension is better, then update
-                formulae_evaluations[state][repr(self)] = extend
-                predcs = ks.stg.graph.predecessors(state)
-                for p in predcs:
-                    queue.increase_priority(p, extend)
+        left, right = formulae_evaluations.column(self.left), formulae_evaluations.column(self.right)
+        out = formulae_evaluations.column(self)
+        self._previous = until_fixpoint(ks, left, right, out, all_paths=False, previous=self._previous)
 
 
 class AW(StateFormula):
     def __init__(self, left: StateFormula, right: StateFormula):
+        super().__init__()
         self.left = left
         self.right = right
 
@@ -569,35 +595,35 @@ class AW(StateFormula):
         return f"A ({repr(self.left)}) W ({repr(self.right)})"
 
     def eliminate_negation(self) -> 'StateFormula':
-        if isinstance(self.left, Negation):
-            self.left = self.left.negate()
-        if isinstance(self.right, Negation):
-            self.right = self.right.negate()
-        self.left = self.left.eliminate_negation()
-        self.right = self.right.eliminate_negation()
-        return self
-
-    def get_subformulae(self) -> List['StateFormula']:
-        sub_left = self.left.get_subformulae()
-        sub_right = self.right.get_subformulae()
-        return sub_left + sub_right + [self]
+        if self._negation_free:
+            return self
+        left = self.left.negate() if isinstance(self.left, Negation) else self.left
+        right = self.right.negate() if isinstance(self.right, Negation) else self.right
+        formula = type(self)(left.eliminate_negation(), right.eliminate_negation())  # interned, never changed
+        formula._negation_free = True
+        return formula
+
+    def _collect(self, out: List['StateFormula'], seen: Set['StateFormula']) -> None:
+        if self not in seen:
+            self.left._collect(out, seen)
+            self.right._collect(out, seen)
+            seen.add(self)
+            out.append(self)
 
     def evaluate(self, ks: KripkeStructure, formulae_evaluations: QuantLabelingFnType) -> None:
         """The problem here is that you cannot optimize between AG and AU online because you have no guarantee on AG
         until it finally converges. It can happen that you overwrite the best AU by best AG at some point, but later
         you find out that the AG is actually very poor. But the information about best AU is already lost.
-        The solution is to optimize both options separately and finally to optimize between them in each state."""
+        The solution is to optimize both options separately and finally to optimize between them in each state.
+        Both options are optimized within a single fixpoint computation that keeps their values apart."""
 
-        ag = AG(self.left)
-        au = AU(self.left, self.right)
-        ag.evaluate(ks, formulae_evaluations)
-        au.evaluate(ks, formulae_evaluations)
-        for state in ks.stg.states:
-            formulae_evaluations[state][repr(self)] = max(formulae_evaluations[state][repr(ag)], formulae_evaluations[state][repr(au)])
+        weak_until_fixpoint(ks, formulae_evaluations.column(self.left), formulae_evaluations.column(self.right),
+                            formulae_evaluations.column(self), all_paths=True)
 
 
 class EW(StateFormula):
     def __init__(self, left: StateFormula, right: StateFormula):
+        super().__init__()
         self.left = left
         self.right = right
 
@@ -605,29 +631,27 @@ class EW(StateFormula):
         return f"E ({repr(self.left)}) W ({repr(self.right)})"
 
     def eliminate_negation(self) -> 'StateFormula':
-        if isinstance(self.left, Negation):
-            self.left = self.left.negate()
-        if isinstance(self.right, Negation):
-            self.right = self.right.negate()
-        self.left = self.left.eliminate_negation()
-        self.right = self.right.eliminate_negation()
-        return self
-
-    def get_subformulae(self) -> List['StateFormula']:
-        sub_left = self.left.get_subformulae()
-        sub_right = self.right.get_subformulae()
-        return sub_left + sub_right + [self]
+        if self._negation_free:
+            return self
+        left = self.left.negate() if isinstance(self.left, Negation) else self.left
+        right = self.right.negate() if isinstance(self.right, Negation) else self.right
+        formula = type(self)(left.eliminate_negation(), right.eliminate_negation())  # interned, never changed
+        formula._negation_free = True
+        return formula
+
+    def _collect(self, out: List['StateFormula'], seen: Set['StateFormula']) -> None:
+        if self not in seen:
+            self.left._collect(out, seen)
+            self.right._collect(out, seen)
+            seen.add(self)
+            out.append(self)
 
     def evaluate(self, ks: KripkeStructure, formulae_evaluations: QuantLabelingFnType) -> None:
         """The problem here is that you cannot optimize between EG and EU online because you have no guarantee on EG
         until it finally converges. It can happen that you overwrite the best EU by best EG at some point, but later
         you find out that the EG is actually very poor. But the information about best EU is already lost.
-        The solution is to optimize both options separately and finally to optimize between them in each state."""
-
-        eg = EG(self.left)
-        eu = EU(self.left, self.right)
+        The solution is to optimize both options separately and finally to optimize between them in each state.
+        Both options are optimized within a single fixpoint computation that keeps their values apart."""
 
-        eg.evaluate(ks, formulae_evaluations)
-        eu.evaluate(ks, formulae_evaluations)
-        for state in ks.stg.states:
-            formulae_evaluations[state][repr(self)] = max(formulae_evaluations[state][repr(eg)], formulae_evaluations[state][repr(eu)])
+        weak_until_fixpoint(ks, formulae_evaluations.column(self.left), formulae_evaluations.column(self.right),
+                            formulae_evaluations.column(self), all_paths=False)
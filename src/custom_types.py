@@ -1,7 +1,36 @@
-from typing import Dict, Tuple, Optional, Set
+from typing import Dict, Tuple, Set
+import numpy as np
 
 
 StateType = Tuple[int, ...]
 SubspaceType = Set[StateType]
+DovType = np.ndarray  # boolean mask over the grid of all the states, one axis per variable
+DomainsType = Tuple[np.ndarray, ...]  # values of each variable as an open grid, see np.ogrid
 MaxActivitiesType = Dict[str, int]
-QuantLabelingFnType = Dict[Tuple[int], Dict[str, Optional[float]]]
+
+
+class FormulaeEvaluations:
+    """
+    Table of the values of formulae in states, one row per state (in the order of ks.state_idx), one column
+    per formula. The columns belong to the table, columns maps the identifier of each formula to its column,
+    so tables of different model checkings sharing (interned) subformulae stay independent.
+
+    @param values: Array of shape (number of states, number of formulae).
+    @param columns: The column of each formula, keyed by the identifier of the formula.
+    """
+
+    def __init__(self, values: np.ndarray, columns: Dict[int, int]) -> None:
+        self.values = values
+        self.columns = columns
+
+    def column(self, formula) -> np.ndarray:
+        """
+        Returns the values of the formula in all the states, a view writable in place.
+
+        @param formula: A formula with a column in the table.
+        @return: The column of the formula, raises KeyError if the formula has no column in the table.
+        """
+        return self.values[:, self.columns[formula._id]]
+
+
+QuantLabelingFnType = FormulaeEvaluations
@@ -0,0 +1,246 @@
+from typing import Optional, Tuple
+from weakref import ref
+import numpy as np
+from numba import njit
+from src.quantitative_ctl import KripkeStructure
+
+
+# weak reference to the Kripke structure, operand values and resulting values of a fixpoint computation,
+# the structure is not kept alive by the formulae that cache their fixpoints
+FixpointType = Tuple['ref[KripkeStructure]', Tuple[np.ndarray, ...], np.ndarray]
+
+
+@njit(cache=True, boundscheck=False)
+def _reduce_successors(values, succ_indptr, succ_indices, row, all_paths):
+    """Returns the minimum (all paths) or the maximum (exists a path) of the values over successors of the row."""
+    result = values[succ_indices[succ_indptr[row]]]
+    for i in range(succ_indptr[row] + 1, succ_indptr[row + 1]):
+        value = values[succ_indices[i]]
+        if (value < result) if all_paths else (value > result):
+            result = value
+    return result
+
+
+@njit(cache=True, boundscheck=False)
+def _enqueue_predecessors(queue, in_queue, tail, pred_indptr, pred_indices, row, final):
+    """
+    Appends the predecessors of the row that are not queued yet and whose value is not final to the queue,
+    returns the new tail. The queue is a ring buffer of capacity equal to the number of states, which suffices
+    as every state is queued at most once at a time.
+    """
+    for i in range(pred_indptr[row], pred_indptr[row + 1]):
+        p = pred_indices[i]
+        if not in_queue[p] and not final[p]:
+            in_queue[p] = True
+            queue[tail % len(queue)] = p
+            tail += 1
+    return tail
+
+
+@njit(cache=True, boundscheck=False)
+def _init_queue(n, seeds, final):
+    """
+    Creates the ring buffer queue of the given capacity containing the seeds whose value is not final,
+    returns it with its bitmap and tail.
+    """
+    queue = np.empty(n, dtype=np.int32)
+    in_queue = np.zeros(n, dtype=np.bool_)
+    tail = 0
+    for row in seeds:
+        if not in_queue[row] and not final[row]:
+            in_queue[row] = True
+            queue[tail] = row
+            tail += 1
+    return queue, in_queue, tail
+
+
+@njit(cache=True, boundscheck=False)
+def _affected_rows(pred_indptr, pred_indices, dirty, transitive):
+    """
+    Returns the dirty states together with their predecessors, with transitive all the states from which
+    a dirty state is reachable.
+    """
+    n = len(pred_indptr) - 1
+    affected = np.zeros(n, dtype=np.bool_)
+    stack = np.empty(n, dtype=np.int32)
+    size = 0
+    for row in dirty:
+        if not affected[row]:
+            affected[row] = True
+            stack[size] = row
+            size += 1
+    while size > 0:
+        size -= 1
+        row = stack[size]
+        for i in range(pred_indptr[row], pred_indptr[row + 1]):
+            p = pred_indices[i]
+            if not affected[p]:
+                affected[p] = True
+                if transitive:
+                    stack[size] = p
+                    size += 1
+    return np.flatnonzero(affected).astype(np.int32)
+
+
+@njit(cache=True, boundscheck=False)
+def _globally_kernel(succ_indptr, succ_indices, pred_indptr, pred_indices, operand, out, seeds, all_paths, minimize):
+    """
+    Fixpoint of the G (minimize) or F (maximize) operators, out holds the starting values.
+
+    States are served in FIFO order starting with seeds, states whose value changes notify their predecessors.
+    A state whose value already equals the minimum (G) or the maximum (F) of the operand cannot change anymore,
+    so it is never queued.
+    """
+    n = len(operand)
+    bound = operand.min() if minimize else operand.max()
+    final = out == bound
+    queue, in_queue, tail = _init_queue(n, seeds, final)
+    head = 0
+    while head < tail:
+        row = queue[head % n]
+        head += 1
+        in_queue[row] = False
+        value = _reduce_successors(operand, succ_indptr, succ_indices, row, all_paths)
+        if (value < out[row]) if minimize else (value > out[row]):
+            out[row] = value  # replace the original value
+            final[row] = value == bound
+            tail = _enqueue_predecessors(queue, in_queue, tail, pred_indptr, pred_indices, row, final)
+
+
+@njit(cache=True, boundscheck=False)
+def _until_kernel(succ_indptr, succ_indices, pred_indptr, pred_indices, left, out, seeds, all_paths):
+    """
+    Fixpoint of the U operator, out holds the starting values.
+
+    States are served in FIFO order starting with seeds, states whose value changes notify their predecessors.
+    An extension never exceeds the left value, so a state whose value reached it cannot change anymore
+    and is never queued.
+    """
+    n = len(left)
+    final = out >= left
+    queue, in_queue, tail = _init_queue(n, seeds, final)
+    head = 0
+    while head < tail:
+        row = queue[head % n]
+        head += 1
+        in_queue[row] = False
+        until_nexts = _reduce_successors(out, succ_indptr, succ_indices, row, all_paths)
+        extend = min(left[row], until_nexts)  # tries to extend the prefix with the current left
+        if extend > out[row]:  # if extension is better than actual value of until, then update
+            out[row] = extend
+            final[row] = extend >= left[row]
+            tail = _enqueue_predecessors(queue, in_queue, tail, pred_indptr, pred_indices, row, final)
+
+
+@njit(cache=True, boundscheck=False)
+def _weak_until_kernel(succ_indptr, succ_indices, pred_indptr, pred_indices, left, right, out, all_paths):
+    """
+    Fixpoint of the W operator, i.e. the maximum of the G fixpoint of the left operand and the U fixpoint.
+
+    Both fixpoints are kept in separate arrays but share a single worklist, a state notifies its predecessors
+    if either of its values changes. A state is never queued once both of its values are final.
+    """
+    n = len(right)
+    globally = left.copy()
+    until = right.copy()
+    bound = left.min()
+    final = (globally == bound) & (until >= left)
+    queue, in_queue, tail = _init_queue(n, np.arange(n, dtype=np.int32), final)
+    head = 0
+    while head < tail:
+        row = queue[head % n]
+        head += 1
+        in_queue[row] = False
+        changed = False
+        value = _reduce_successors(left, succ_indptr, succ_indices, row, all_paths)
+        if value < globally[row]:
+            globally[row] = value
+            changed = True
+        extend = min(left[row], _reduce_successors(until, succ_indptr, succ_indices, row, all_paths))
+        if extend > until[row]:
+            until[row] = extend
+            changed = True
+        if changed:
+            final[row] = (globally[row] == bound) and (until[row] >= left[row])
+            tail = _enqueue_predecessors(queue, in_queue, tail, pred_indptr, pred_indices, row, final)
+    np.maximum(globally, until, out)
+
+
+def globally_fixpoint(ks: KripkeStructure, operand_col: np.ndarray, out_col: np.ndarray,
+                      all_paths: bool, minimize: bool, previous: Optional[FixpointType] = None) -> FixpointType:
+    """
+    Computes the values of AG (all paths, minimize), EG (exists, minimize), AF (all paths, maximize)
+    or EF (exists, maximize) in all states from the operand values.
+
+    If the result of a previous computation over the same Kripke structure is given, only the states whose
+    operand value changed since then and their predecessors are recomputed.
+
+    @param ks: The Kripke structure over which the formula is evaluated.
+    @param operand_col: Values of the operand, indexed by the state index of the Kripke structure.
+    @param out_col: Array the values of the formula are written to.
+    @param all_paths: Whether successors are combined by minimum (A) or by maximum (E).
+    @param minimize: Whether the value of a state is improved by decreasing it (G) or by increasing it (F).
+    @param previous: The value returned by the previous computation of the same formula, if any.
+    @return: The computation state to be passed as previous to the next computation.
+    """
+    operand = np.array(operand_col)
+    if previous is not None and previous[0]() is ks:
+        _, (prev_operand,), prev_out = previous
+        seeds = _affected_rows(ks.pred_indptr, ks.pred_indices, np.flatnonzero(prev_operand != operand), False)
+        out = prev_out.copy()
+        out[seeds] = operand[seeds]
+    else:
+        seeds = np.arange(len(operand), dtype=np.int32)  # every state has a successor, so all of them are notified
+        out = operand.copy()
+    _globally_kernel(ks.succ_indptr, ks.succ_indices, ks.pred_indptr, ks.pred_indices,
+                     operand, out, seeds, all_paths, minimize)
+    out_col[:] = out
+    return ref(ks), (operand,), out
+
+
+def until_fixpoint(ks: KripkeStructure, left_col: np.ndarray, right_col: np.ndarray, out_col: np.ndarray,
+                   all_paths: bool, previous: Optional[FixpointType] = None) -> FixpointType:
+    """
+    Computes the values of AU (all paths) or EU (exists) in all states from the values of its operands.
+
+    If the result of a previous computation over the same Kripke structure is given, only the states from which
+    a state with changed operand values is reachable are recomputed.
+
+    @param ks: The Kripke structure over which the formula is evaluated.
+    @param left_col: Values of the left operand, indexed by the state index of the Kripke structure.
+    @param right_col: Values of the right operand, indexed by the state index of the Kripke structure.
+    @param out_col: Array the values of the formula are written to.
+    @param all_paths: Whether successors are combined by minimum (A) or by maximum (E).
+    @param previous: The value returned by the previous computation of the same formula, if any.
+    @return: The computation state to be passed as previous to the next computation.
+    """
+    left, right = np.array(left_col), np.array(right_col)
+    if previous is not None and previous[0]() is ks:
+        _, (prev_left, prev_right), prev_out = previous
+        dirty = np.flatnonzero((prev_left != left) | (prev_right != right))
+        seeds = _affected_rows(ks.pred_indptr, ks.pred_indices, dirty, True)
+        out = prev_out.copy()
+        out[seeds] = right[seeds]
+    else:
+        seeds = np.arange(len(right), dtype=np.int32)
+        out = right.copy()  # initialize the computation with the right operand value in each state
+    _until_kernel(ks.succ_indptr, ks.succ_indices, ks.pred_indptr, ks.pred_indices, left, out, seeds, all_paths)
+    out_col[:] = out
+    return ref(ks), (left, right), out
+
+
+def weak_until_fixpoint(ks: KripkeStructure, left_col: np.ndarray, right_col: np.ndarray, out_col: np.ndarray,
+                        all_paths: bool) -> None:
+    """
+    Computes the values of AW (all paths) or EW (exists) in all states from the values of its operands.
+
+    @param ks: The Kripke structure over which the formula is evaluated.
+    @param left_col: Values of the left operand, indexed by the state index of the Kripke structure.
+    @param right_col: Values of the right operand, indexed by the state index of the Kripke structure.
+    @param out_col: Array the values of the formula are written to.
+    @param all_paths: Whether successors are combined by minimum (A) or by maximum (E).
+    """
+    out = np.empty(len(right_col), dtype=right_col.dtype)
+    _weak_until_kernel(ks.succ_indptr, ks.succ_indices, ks.pred_indptr, ks.pred_indices,
+                       np.ascontiguousarray(left_col), np.ascontiguousarray(right_col), out, all_paths)
+    out_col[:] = out
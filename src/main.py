@@ -125,18 +125,19 @@ def generate_initial_states(initial_states: dict, variables: dict):
     return all_states
 
 
-def format_result(formulae_evaluations, initial_states, formula) -> None:
+def format_result(ks, formulae_evaluations, formula) -> None:
     """
     Formats and prints the results of the formula evaluation on initial states.
 
-    @param formulae_evaluations: Dictionary mapping states to formula evaluations
-    @param initial_states: List of initial states
+    @param ks: Kripke structure the formula was evaluated in, provides the initial states and state indices
+    @param formulae_evaluations: Table of formula evaluations, one row per state
     @param formula: The formula being evaluated
     """
+    initial_states = ks.init_states
     minimum, maximum, cumulative = inf, -inf, 0
     min_state, max_state = None, None
     for state in initial_states:
-        value = formulae_evaluations[state][repr(formula)]
+        value = formulae_evaluations.column(formula)[ks.state_idx[state]]
         if value < minimum:
             min_state = state
             minimum = value
@@ -171,7 +172,7 @@ def main(json_file):
     #initial_states = generate_initial_states(json_data.get("initial_states"), json_data.get("network").get("variables"))
     #ks = KripkeStructure(stg, initial_states)
     #formulae_evaluations = model_check(ks, positive_formula)
-    #format_result(formulae_evaluations, ks.init_states, positive_formula)
+    #format_result(ks, formulae_evaluations, positive_formula)
     visualize_stg_pyvis(stg.graph)
 
 if __name__ == "__main__":
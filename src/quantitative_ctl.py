@@ -1,5 +1,8 @@
-from typing import Optional, List
-from src.custom_types import StateType, QuantLabelingFnType
+from typing import Optional, List, Callable, Iterable, Tuple
+from itertools import chain
+from functools import cached_property
+import numpy as np
+from src.custom_types import StateType, QuantLabelingFnType, MaxActivitiesType, DomainsType, FormulaeEvaluations
 
 
 class KripkeStructure:
@@ -11,11 +14,64 @@ class KripkeStructure:
 
     @param stg: The state transition graph representing the structure.
     @param init_states: A list of initial states. If None, defaults to all states in the transition graph.
+
+    The variables are indexed in the order of stg.variables by var_idx, their maximal activities and the weights
+    of a single step along them are kept in the arrays max_arr and weights_arr.
+
+    The successors and predecessors of the states are precomputed in CSR layout over state indices, i.e. the
+    successors of the state with index i are succ_indices[succ_indptr[i]:succ_indptr[i + 1]]. Every state is
+    required to have at least one successor (the state transition graph adds a self-loop to states without one),
+    ValueError is raised otherwise.
     """
 
     def __init__(self, stg, init_states: Optional[List[StateType]] = None):
         self.stg = stg
         self.init_states = init_states if init_states is not None else stg.states
+        self.states_arr = np.array(stg.states, dtype=np.int32).reshape(len(stg.states), len(stg.variables))
+        self.state_idx = {state: idx for idx, state in enumerate(stg.states)}
+        self.var_idx = {variable: idx for idx, variable in enumerate(stg.variables)}
+        self.max_arr = np.array(list(stg.variables.values()), dtype=np.int32)
+        self.weights_arr = 1 / self.max_arr  # weight of a single step along each variable
+        self.succ_indptr, self.succ_indices = self._to_csr(stg.graph.successors)
+        if (np.diff(self.succ_indptr) == 0).any():
+            raise ValueError("Every state of the Kripke structure must have at least one successor.")
+        self.pred_indptr, self.pred_indices = self._to_csr(stg.graph.predecessors)
+
+    def _to_csr(self, neighbours: Callable[[StateType], Iterable[StateType]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Builds the CSR representation of the given neighbourhood relation of the states.
+
+        @param neighbours: Function yielding the neighbours of a state.
+        @return: Pair (indptr, indices) of int32 arrays.
+        """
+        rows = [[self.state_idx[n] for n in neighbours(state)] for state in self.stg.states]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int32)
+        np.cumsum([len(row) for row in rows], out=indptr[1:])
+        indices = np.fromiter(chain.from_iterable(rows), dtype=np.int32, count=indptr[-1])
+        return indptr, indices
+
+    @cached_property
+    def initial_dov(self) -> DomainsType:
+        """The domains of all the variables, computed once and shared by all the atomic formulae."""
+        return full_domains(self.stg.variables)
+
+    @cached_property
+    def grid_indices(self) -> np.ndarray:
+        """Indices of the states (in the order of state_idx) into the flattened grid of all the states."""
+        return np.ravel_multi_index(tuple(self.states_arr.T), tuple(self.max_arr + 1)).astype(np.int32)
+
+
+def full_domains(max_activities: MaxActivitiesType) -> DomainsType:
+    """
+    Creates the domains of the variables, i.e. the initial domain of validity containing all the states.
+
+    The domain of each variable is an array of its values shaped along its own axis of the grid of all the states,
+    so that conditions on a single variable broadcast over the whole grid.
+
+    @param max_activities: The maximum possible values for each variable.
+    @return: Tuple of the value arrays, one per variable.
+    """
+    return tuple(np.ogrid[tuple(slice(max_activity + 1) for max_activity in max_activities.values())])
 
 
 def model_check(ks: KripkeStructure, formula) -> QuantLabelingFnType:
@@ -23,33 +79,42 @@ def model_check(ks: KripkeStructure, formula) -> QuantLabelingFnType:
     Performs model checking for a given Kripke structure and logical formula.
 
     The algorithm follows these steps:
-    1. Extract all subformulae from the given formula.
-    2. Initialize a dictionary to store evaluation results for each state and subformula.
-    3. Evaluate each subformula iteratively in the order provided.
+    1. Extract all subformulae from the given formula and assign each of them a column. Shared (interned)
+       subformulae are listed only once, so each of them is evaluated once. Atomic subformulae have no
+       subformulae of their own and get the leading columns.
+    2. Initialize a table to store evaluation results for each state and subformula.
+    3. Evaluate all the atomic subformulae at once, then each other subformula iteratively in the order provided.
 
     @param ks: The Kripke structure on which to perform model checking.
     @param formula: The logical formula to be evaluated within the structure.
-    @return: A mapping of states to their evaluation results for each subformula.
+    @return: A table of evaluation results, row ks.state_idx[state] of formulae_evaluations.column(sf) holds
+    the value of subformula sf in the state.
     """
-    subformulae = formula.get_subformulae()
-    formulae_evaluations = init_formulae_evaluations(ks, [repr(sf) for sf in subformulae])
+    from src.ctl_formulae import AtomicFormula  # ctl_formulae depends on this module
+
+    atomic = [sf for sf in formula.get_subformulae() if isinstance(sf, AtomicFormula)]
+    others = [sf for sf in formula.get_subformulae() if not isinstance(sf, AtomicFormula)]
+    formulae_evaluations = init_formulae_evaluations(ks, atomic + others)
 
-    for sf in subformulae:
+    if atomic:
+        AtomicFormula.evaluate_batch(ks, atomic, formulae_evaluations.values[:, :len(atomic)])
+    for sf in others:
         sf.evaluate(ks, formulae_evaluations)
 
     return formulae_evaluations
 
 
-def init_formulae_evaluations(ks: KripkeStructure, labels: List[str]) -> QuantLabelingFnType:
+def init_formulae_evaluations(ks: KripkeStructure, formulae: List) -> QuantLabelingFnType:
     """
-    Initializes a dictionary to store the evaluation results of formulas for each state in the Kripke structure.
+    Initializes a table to store the evaluation results of formulas for each state in the Kripke structure.
 
-    The dictionary structure is as follows:
-    - Each state in the Kripke structure maps to another dictionary.
-    - This nested dictionary maps each formula label to its evaluation result (initially set to None).
+    The table has a row for each state in the Kripke structure (in the order of ks.state_idx) and a column for each
+    formula, in the order of the given formulae. All the values are initially set to NaN (not evaluated yet).
+    The values lie in [-1, 1] and the fixpoints only take minima and maxima of them, so single precision suffices.
 
     @param ks: The Kripke structure containing states to initialize evaluations for.
-    @param labels: A list of string representations of formulae to be evaluated.
-    @return: A dictionary mapping each state to a dictionary of formula evaluations (initially None).
+    @param formulae: The formulae to be evaluated.
+    @return: The table with a float32 array of shape (number of states, number of formulae) filled with NaN.
     """
-    return {state: {label: None for label in labels} for state in ks.stg.states}
+    values = np.full((len(ks.stg.states), len(formulae)), np.nan, dtype=np.float32)
+    return FormulaeEvaluations(values, {formula._id: column for column, formula in enumerate(formulae)})
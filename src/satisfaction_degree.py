@@ -1,5 +1,7 @@
 from typing import List, Tuple
 from math import inf
+import numpy as np
+from numba import njit, prange
 from src.custom_types import SubspaceType, StateType
 from src.priority_queue import MinPriorityQueue
 
@@ -124,3 +126,73 @@ def find_extreme_state(dov: SubspaceType, co_border: SubspaceType, max_act_value
 
     extreme = max(dp[state] for state in dov)
     return extreme
+
+
+def weighted_distance_transform(masks: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Compute for every state of the grid the shortest weighted Hamming distance to a state outside the mask.
+
+    The shortest weighted Hamming path between two states of the grid is given by their weighted Manhattan distance,
+    which is separable, so the distances are computed by a forward and a backward sweep along each axis.
+    The nearest state outside the mask is always a border state of the complement and the path to it lies within
+    the mask, hence the result coincides with weighted_distance and find_extreme_state.
+
+    @param masks: Boolean mask over the grid of all the states, one (trailing) axis per variable. Leading axes,
+    if any, index several masks that are processed at once.
+    @param weights: Weight of a single step along each axis.
+    @return: Array of the shape of the masks, zero outside the mask and infinity if there is no state outside.
+    """
+    distances = np.where(masks, inf, 0.0)
+    for axis, weight in enumerate(weights, start=masks.ndim - len(weights)):
+        view = np.moveaxis(distances, axis, 0)  # sweeps along the axis operate on whole hyperplanes at once
+        for i in range(1, len(view)):
+            np.minimum(view[i], view[i - 1] + weight, out=view[i])
+        for i in range(len(view) - 2, -1, -1):
+            np.minimum(view[i], view[i + 1] + weight, out=view[i])
+    return distances
+
+
+@njit(parallel=True, cache=True)
+def _satisfaction_degree_kernel(grid_indices, dovs, depths, distances, max_depths, max_dists, out):
+    """
+    Normalizes the depth of the states inside each DoV and the negated distance of the states outside it,
+    all the DoVs are processed within a single pass over the states.
+    """
+    for i in prange(len(grid_indices)):
+        cell = grid_indices[i]
+        for j in range(len(dovs)):
+            if max_depths[j] <= 0:
+                out[i, j] = 0
+            elif dovs[j, cell]:
+                out[i, j] = depths[j, cell] / max_depths[j]
+            else:
+                out[i, j] = -distances[j, cell] / max_dists[j]
+
+
+def satisfaction_degree_batch(dovs: np.ndarray, grid_indices: np.ndarray, weights: np.ndarray,
+                              out: np.ndarray) -> None:
+    """
+    Compute the satisfaction degrees of the given states, i.e. their weighted signed distances to the border
+    of the domain of validity normalized by the extreme distance on the same side of the border.
+
+    States inside the DoV get the (positive) distance to the co-DoV border, states outside get the negated
+    distance to the DoV border. The extreme distances do not depend on the individual states, so they are
+    computed only once for the whole DoV. If the DoV has no depth, all the degrees are zero.
+
+    @param dovs: The domains of validity, an array of boolean masks over the grid of all the states.
+    @param grid_indices: Indices of the states into the flattened grid of all the states.
+    @param weights: Weight of a single step in each dimension.
+    @param out: Array of shape (number of states, number of DoVs) the satisfaction degrees are written to.
+    """
+    if out.shape != (len(grid_indices), len(dovs)):  # the kernel does not check bounds
+        raise ValueError(f"Output of shape {(len(grid_indices), len(dovs))} expected, got {out.shape}.")
+    depths = weighted_distance_transform(dovs, weights).reshape(len(dovs), -1)
+    distances = weighted_distance_transform(~dovs, weights).reshape(len(dovs), -1)
+    dovs = dovs.reshape(len(dovs), -1)  # the states are addressed by their index into the flattened grid
+    inside_counts = dovs.sum(axis=1)
+    if ((inside_counts == 0) | (inside_counts == dovs.shape[1])).any():
+        raise ValueError("The extreme distances are undefined for an empty or a full domain of validity.")
+    max_depths = np.where(dovs, depths, -inf).max(axis=1)
+    max_dists = np.where(dovs, -inf, distances).max(axis=1)
+    # states are independent, so they are processed in parallel in a single pass
+    _satisfaction_degree_kernel(grid_indices, dovs, depths, distances, max_depths, max_dists, out)
@@ -0,0 +1,97 @@
+import gc
+import unittest
+from types import SimpleNamespace
+import networkx as nx
+import numpy as np
+from src.quantitative_ctl import KripkeStructure
+from src.fixpoints import globally_fixpoint, until_fixpoint, weak_until_fixpoint
+
+
+class TestFixpoints(unittest.TestCase):
+    def setUp(self):
+        graph = nx.DiGraph([((0,), (1,)), ((1,), (2,)), ((2,), (2,))])
+        stg = SimpleNamespace(states=[(0,), (1,), (2,)], variables={"x": 2}, graph=graph)
+        self.ks = KripkeStructure(stg)
+
+    def test_state_without_successor_rejected(self):
+        graph = nx.DiGraph([((0,), (1,)), ((1,), (1,))])
+        graph.add_node((2,))
+        with self.assertRaises(ValueError):
+            KripkeStructure(SimpleNamespace(states=[(0,), (1,), (2,)], variables={"x": 2}, graph=graph))
+
+    def test_globally_all_paths(self):
+        out = np.empty(3)
+        globally_fixpoint(self.ks, np.array([0.5, -0.5, 1.0]), out, all_paths=True, minimize=True)
+        self.assertEqual(out.tolist(), [-0.5, -0.5, 1.0])
+
+    def test_finally_exists(self):
+        out = np.empty(3)
+        globally_fixpoint(self.ks, np.array([0.5, -0.5, 1.0]), out, all_paths=False, minimize=False)
+        self.assertEqual(out.tolist(), [0.5, 1.0, 1.0])
+
+    def test_until_all_paths(self):
+        out = np.empty(3)
+        until_fixpoint(self.ks, np.array([1.0, 1.0, -1.0]), np.array([-1.0, -1.0, 0.5]), out, all_paths=True)
+        self.assertEqual(out.tolist(), [0.5, 0.5, 0.5])
+
+    def test_until_right_above_left(self):
+        out = np.empty(3)
+        until_fixpoint(self.ks, np.array([0.5, -0.5, 0.0]), np.array([0.5, 1.0, 0.0]), out, all_paths=True)
+        self.assertEqual(out.tolist(), [0.5, 1.0, 0.0])
+
+    def test_weak_until_all_paths(self):
+        out = np.empty(3)
+        weak_until_fixpoint(self.ks, np.array([1.0, 1.0, -1.0]), np.array([-1.0, -1.0, 0.5]), out, all_paths=True)
+        self.assertEqual(out.tolist(), [1.0, 0.5, 0.5])
+
+    def test_columns_of_formulae_evaluations(self):
+        evals = np.array([[1.0, -1.0, 0.0], [1.0, -1.0, 0.0], [-1.0, 0.5, 0.0]])
+        until_fixpoint(self.ks, evals[:, 0], evals[:, 1], evals[:, 2], all_paths=False)
+        self.assertEqual(evals[:, 2].tolist(), [0.5, 0.5, 0.5])
+
+    def test_single_precision_columns(self):
+        evals = np.array([[1.0, -1.0, 0.0], [1.0, -1.0, 0.0], [-1.0, 0.5, 0.0]], dtype=np.float32)
+        weak_until_fixpoint(self.ks, evals[:, 0], evals[:, 1], evals[:, 2], all_paths=True)
+        self.assertEqual(evals[:, 2].tolist(), [1.0, 0.5, 0.5])
+
+
+class TestIncrementalFixpoints(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        states = [(i,) for i in range(60)]
+        graph = nx.DiGraph([(s, states[t]) for s in states for t in rng.choice(60, size=2)])
+        self.ks = KripkeStructure(SimpleNamespace(states=states, variables={"x": 59}, graph=graph))
+        self.left, self.right = rng.uniform(-1, 1, 60), rng.uniform(-1, 1, 60)
+        self.changed_left, self.changed_right = self.left.copy(), self.right.copy()
+        self.changed_left[[3, 17, 25]] = [-0.9, 0.95, -1.0]
+        self.changed_right[np.argsort(self.right)[-10:]] = -1.0  # the best states get worse
+        self.changed_right[42] = 0.99
+
+    def test_globally_incremental(self):
+        for all_paths in (True, False):
+            for minimize in (True, False):
+                out, expected = np.empty(60), np.empty(60)
+                previous = globally_fixpoint(self.ks, self.left, out, all_paths, minimize)
+                globally_fixpoint(self.ks, self.changed_left, out, all_paths, minimize, previous)
+                globally_fixpoint(self.ks, self.changed_left, expected, all_paths, minimize)
+                self.assertEqual(out.tolist(), expected.tolist())
+
+    def test_previous_does_not_keep_structure_alive(self):
+        ks = KripkeStructure(self.ks.stg)
+        previous = globally_fixpoint(ks, self.left, np.empty(60), True, True)
+        self.assertIs(previous[0](), ks)
+        del ks
+        gc.collect()
+        self.assertIsNone(previous[0]())
+
+    def test_until_incremental(self):
+        for all_paths in (True, False):
+            out, expected = np.empty(60), np.empty(60)
+            previous = until_fixpoint(self.ks, self.left, self.right, out, all_paths)
+            until_fixpoint(self.ks, self.changed_left, self.changed_right, out, all_paths, previous)
+            until_fixpoint(self.ks, self.changed_left, self.changed_right, expected, all_paths)
+            self.assertEqual(out.tolist(), expected.tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
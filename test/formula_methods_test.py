@@ -1,5 +1,10 @@
 import unittest
-from src.ctl_formulae import AtomicProposition, Negation, Union, Intersection, Conjunction, Disjunction, EX, AX, EF, AF, EG, AG, EU, AU, EW, AW
+from itertools import product
+from types import SimpleNamespace
+import networkx as nx
+import numpy as np
+from src.quantitative_ctl import KripkeStructure, model_check, init_formulae_evaluations
+from src.ctl_formulae import AtomicFormula, AtomicProposition, Negation, Union, Intersection, Conjunction, Disjunction, EX, AX, EF, AF, EG, AG, EU, AU, EW, AW
 from copy import deepcopy
 
 
@@ -30,6 +35,46 @@ class CTLSubformulaeTest(unittest.TestCase):
         self.assertEqual(subformulae, expected_subformulae)
 
 
+class CTLInterningTest(unittest.TestCase):
+    def test_structurally_equal_formulae_are_shared(self):
+        formula = Conjunction(EF(AtomicProposition("a", ">=", 5)), EX(AtomicProposition("a", ">=", 5)))
+        self.assertIs(formula.left.operand, formula.right.operand)
+        self.assertIs(EF(AtomicProposition("a", ">=", 5)), formula.left)
+        self.assertIsNot(EF(AtomicProposition("a", "<=", 5)), formula.left)
+
+    def test_get_subformulae_memoized(self):
+        formula = AG(Disjunction(AtomicProposition("a", ">=", 5), AtomicProposition("b", "<=", 3)))
+        self.assertIs(formula.get_subformulae(), formula.get_subformulae())
+
+    def test_get_subformulae_shared_listed_once(self):
+        prop_a = AtomicProposition("a", ">=", 5)
+        ef = EF(prop_a)
+        formula = Disjunction(AU(prop_a, ef), EX(ef))
+        self.assertEqual(formula.get_subformulae(), [prop_a, ef, formula.left, formula.right, formula])
+
+
+    def test_tables_sharing_subformulae_stay_independent(self):
+        states = [(0,), (1,), (2,)]
+        graph = nx.DiGraph([((0,), (1,)), ((1,), (2,)), ((2,), (2,))])
+        ks = KripkeStructure(SimpleNamespace(states=states, variables={"x": 2}, graph=graph))
+        prop_p, prop_q = AtomicProposition("x", "<=", 1), AtomicProposition("x", ">=", 2)
+        first = model_check(ks, AU(prop_p, EF(prop_q)))
+        expected = first.column(EF(prop_q)).tolist()
+        second = model_check(ks, Disjunction(AtomicProposition("x", ">=", 1), EX(EF(prop_q))))
+        self.assertEqual(first.column(EF(prop_q)).tolist(), expected)
+        self.assertEqual(second.column(EF(prop_q)).tolist(), expected)
+        self.assertEqual(first.column(prop_p).tolist(), [1.0, 0.5, -1.0])
+        with self.assertRaises(KeyError):
+            first.column(EX(EF(prop_q)))
+
+    def test_eliminate_negation_keeps_interned_formula(self):
+        formula = AG(Negation(AtomicProposition("x", ">=", 1)))
+        normalized = formula.eliminate_negation()
+        self.assertEqual(repr(normalized), "AG ((x <= 0))")
+        self.assertEqual(repr(AG(Negation(AtomicProposition("x", ">=", 1)))), "AG (!(x >= 1))")
+        self.assertIs(AG(Negation(AtomicProposition("x", ">=", 1))), formula)
+
+
 class CTLEliminateNegationTest(unittest.TestCase):
     def test_eliminate_negation_temporal(self):
         prop_a = AtomicProposition("a", ">=", 5)
@@ -73,6 +118,14 @@ class CTLEliminateNegationTest(unittest.TestCase):
         self.assertEqual(formula.right.operand.operator, "<=")
         self.assertEqual(formula.right.operand.value, 2)
 
+    def test_eliminate_negation_marks_normalized(self):
+        formula = AG(Conjunction(Negation(AtomicProposition("a", ">=", 5)), EX(AtomicProposition("b", "<=", 3))))
+        formula = formula.eliminate_negation()
+        self.assertTrue(formula._negation_free and formula.operand._negation_free)
+        self.assertTrue(formula.operand.right._negation_free)
+        self.assertIs(formula.eliminate_negation(), formula)
+        self.assertEqual(formula.operand.left.operator, "<=")
+
     def test_eliminate_double_negation(self):
         prop_a = AtomicProposition("a", ">=", 5)
         prop_b = AtomicProposition("b", "<=", 3)
@@ -84,6 +137,33 @@ class CTLEliminateNegationTest(unittest.TestCase):
         self.assertEqual(formula.left.value, 5)
 
 
+class TestAtomicEvaluation(unittest.TestCase):
+    def setUp(self):
+        states = list(product(range(4), range(3)))
+        graph = nx.DiGraph([(state, state) for state in states])
+        self.ks = KripkeStructure(SimpleNamespace(states=states, variables={"x": 3, "y": 2}, graph=graph))
+
+    def test_evaluate_batch_matches_evaluate(self):
+        atomic_formulae = [AtomicProposition("x", ">=", 2), Union(AtomicProposition("x", "<=", 0),
+                                                                  AtomicProposition("y", ">=", 2))]
+        expected = init_formulae_evaluations(self.ks, atomic_formulae)
+        for formula in atomic_formulae:
+            formula.evaluate(self.ks, expected)
+        out = np.empty_like(expected.values)
+        AtomicFormula.evaluate_batch(self.ks, atomic_formulae, out)
+        self.assertEqual(out.tolist(), expected.values.tolist())
+        self.assertEqual(out[self.ks.state_idx[(3, 0)], 0], 1.0)
+        self.assertEqual(out[self.ks.state_idx[(0, 0)], 0], -1.0)
+
+    def test_evaluate_outside_table_raises(self):
+        evals = init_formulae_evaluations(self.ks, [AtomicProposition("x", ">=", 2)])
+        with self.assertRaises(KeyError):
+            AtomicProposition("y", ">=", 1).evaluate(self.ks, evals)
+        with self.assertRaises(ValueError):
+            AtomicFormula.evaluate_batch(self.ks, [AtomicProposition("y", ">=", 1)], evals.values[:, :0])
+        self.assertTrue(np.isnan(evals.values).all())
+
+
 class TestYieldDov(unittest.TestCase):
     def setUp(self):
         self.max_activities = {"x": 3, "y": 2, "z": 2}
@@ -107,6 +187,19 @@ class TestYieldDov(unittest.TestCase):
         x = union_formula.compute_dov(deepcopy(self.dov), self.max_activities)
         self.assertEqual(x, expected_dov)
 
+    def test_union_mask(self):
+        union_formula = Union(AtomicProposition("x", "<=", 0), AtomicProposition("y", "<=", 0))
+        dov = union_formula.compute_dov(self.max_activities)
+        self.assertEqual(dov.shape, (4, 3, 3))
+        self.assertTrue(dov[0].all() and dov[:, 0].all())
+        self.assertEqual(int(dov.sum()), 1 * 3 * 3 + 4 * 1 * 3 - 1 * 1 * 3)
+
+    def test_intersection_mask(self):
+        intersection_formula = Intersection(AtomicProposition("x", ">=", 1), AtomicProposition("z", "<=", 1))
+        dov = intersection_formula.compute_dov(self.max_activities)
+        self.assertEqual(set(map(tuple, np.argwhere(dov).tolist())),
+                         {(x, y, z) for x in range(1, 4) for y in range(3) for z in range(2)})
+
     # def test_intersection(self):
     #     formula1 = AtomicProposition("x", ">=", 3)
     #     formula2 = AtomicProposition("x", "<=", 7)
@@ -5,6 +5,10 @@ from src.ctl_formulae import AtomicProposition, Negation, Union, Intersection, C
 
 class TestFormulaParser(unittest.TestCase):
 
+    def test_reparse_after_eliminate_negation(self):
+        parse_formula("AG (!(x >= 1))").eliminate_negation()
+        self.assertEqual(repr(parse_formula("AG (!(x >= 1))")), "AG (!(x >= 1))")
+
     def test_nested_conjunctions_and_disjunctions(self):
         formula = "(AG(x >= 5)) && (EF(y <= 3 | z >= 10))"
         result = parse_formula(formula)
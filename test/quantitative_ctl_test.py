@@ -0,0 +1,27 @@
+import unittest
+from types import SimpleNamespace
+import networkx as nx
+from src.quantitative_ctl import KripkeStructure, model_check
+from src.ctl_formulae import AtomicProposition, Conjunction, AX, EX
+
+
+class TestModelCheck(unittest.TestCase):
+    def setUp(self):
+        graph = nx.DiGraph([((0,), (1,)), ((1,), (2,)), ((1,), (0,)), ((2,), (2,))])
+        self.ks = KripkeStructure(SimpleNamespace(states=[(0,), (1,), (2,)], variables={"x": 2}, graph=graph))
+        self.prop = AtomicProposition("x", ">=", 1)
+
+    def test_atomic_proposition(self):
+        evals = model_check(self.ks, self.prop)
+        self.assertEqual(evals.column(self.prop).tolist(), [-1.0, 0.5, 1.0])
+
+    def test_next(self):
+        formula = Conjunction(AX(self.prop), EX(self.prop))
+        evals = model_check(self.ks, formula)
+        self.assertEqual(evals.column(AX(self.prop)).tolist(), [0.5, -1.0, 1.0])
+        self.assertEqual(evals.column(EX(self.prop)).tolist(), [0.5, 1.0, 1.0])
+        self.assertEqual(evals.column(formula).tolist(), [0.5, -1.0, 1.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from itertools import product
+import numpy as np
+from src.satisfaction_degree import satisfaction_degree_batch, weighted_distance, find_extreme_state, \
+    get_border_states
+
+
+class TestSatisfactionDegreeBatch(unittest.TestCase):
+    def setUp(self):
+        self.max_activities = [3, 4]
+        self.states_arr = np.array(list(product(range(4), range(5))), dtype=np.int32)
+        self.grid_indices = np.arange(len(self.states_arr), dtype=np.int32)
+        self.weights = np.array([1 / max_activity for max_activity in self.max_activities])
+
+    def reference_degrees(self, dov_mask):
+        dov = set(map(tuple, np.argwhere(dov_mask).tolist()))
+        co_dov = set(map(tuple, np.argwhere(~dov_mask).tolist()))
+        dov_b, co_dov_b = get_border_states(dov, self.max_activities)
+        max_depth = find_extreme_state(dov, co_dov_b, self.max_activities)
+        max_dist = find_extreme_state(co_dov, dov_b, self.max_activities)
+        return [weighted_distance(state, co_dov_b, self.max_activities) / max_depth if state in dov
+                else -weighted_distance(state, dov_b, self.max_activities) / max_dist
+                for state in map(tuple, self.states_arr.tolist())]
+
+    def test_non_convex_dovs(self):
+        ring = np.ones((4, 5), dtype=bool)
+        ring[1:3, 1:4] = False  # a hole in the middle
+        corner = np.zeros((4, 5), dtype=bool)
+        corner[0, :] = corner[:, 0] = True  # an L shape along two sides
+        corner[3, 4] = True  # and an isolated state
+        dovs = np.stack([ring, corner])
+        out = np.empty((len(self.states_arr), 2))
+        satisfaction_degree_batch(dovs, self.grid_indices, self.weights, out)
+        for column, dov in enumerate(dovs):
+            for value, expected in zip(out[:, column], self.reference_degrees(dov)):
+                self.assertAlmostEqual(value, expected, places=12)
+
+    def test_full_dov_rejected(self):
+        out = np.empty((len(self.states_arr), 1))
+        with self.assertRaises(ValueError):
+            satisfaction_degree_batch(np.ones((1, 4, 5), dtype=bool), self.grid_indices, self.weights, out)
+
+
+if __name__ == '__main__':
+    unittest.main()